@@ -0,0 +1,124 @@
+import numpy as np
+from numba import njit, prange
+
+# Detection policy. Kernels take these as default arguments: when a caller omits
+# them Numba compiles the value in as a constant, so the window arithmetic and the
+# 10-wide stencil are specialized. cache=True keeps the compiled code on disk
+# so worker processes do not recompile on every start.
+WINDOW_SECONDS = 259200  # 72 hours
+SMURFING_MIN_COUNT = 10
+VELOCITY_GAP_SECONDS = 3600  # 1 hour
+
+WINDOW_BLOCK = 8  # window starts compared per early-exit check
+
+
+@njit(cache=True)
+def any_window(ts, start, end, window, min_count):
+    """
+    True if some min_count consecutive entries of the sorted row ts[start:end]
+    span <= window seconds. Compares are OR-ed branchlessly over blocks of
+    WINDOW_BLOCK starts (vectorizable) with one early-exit test per block.
+    """
+    span = min_count - 1
+    last = end - span
+    i = start
+    while i + WINDOW_BLOCK <= last:
+        acc = False
+        for j in range(i, i + WINDOW_BLOCK):
+            acc |= ts[j + span] - ts[j] <= window
+        if acc:
+            return True
+        i += WINDOW_BLOCK
+    acc = False
+    for j in range(i, last):
+        acc |= ts[j + span] - ts[j] <= window
+    return acc
+
+
+@njit(parallel=True, cache=True)
+def scan_window(row_ptr, ts, candidates, window=WINDOW_SECONDS, min_count=SMURFING_MIN_COUNT):
+    """
+    Smurfing window scan over a CSR view whose rows are sorted by timestamp.
+    Returns a mask over `candidates` for nodes with >= min_count transactions
+    inside `window` seconds.
+    """
+    flagged = np.zeros(candidates.size, dtype=np.bool_)
+    for k in prange(candidates.size):
+        u = candidates[k]
+        flagged[k] = any_window(ts, row_ptr[u], row_ptr[u + 1], window, min_count)
+    return flagged
+
+
+@njit(cache=True)
+def has_velocity_burst(out_ptr, out_ts, in_ptr, in_ts, u, gap):
+    """
+    True if any two transactions touching node u (in or out) are less than
+    `gap` seconds apart. Walks both sorted rows as a merge.
+    """
+    i = out_ptr[u]
+    i_end = out_ptr[u + 1]
+    j = in_ptr[u]
+    j_end = in_ptr[u + 1]
+    have_prev = False
+    prev = np.int64(0)
+    while i < i_end or j < j_end:
+        if j >= j_end or (i < i_end and out_ts[i] <= in_ts[j]):
+            cur = out_ts[i]
+            i += 1
+        else:
+            cur = in_ts[j]
+            j += 1
+        if have_prev and cur - prev < gap:
+            return True
+        prev = cur
+        have_prev = True
+    return False
+
+
+@njit(parallel=True, cache=True)
+def scan_velocity(out_ptr, out_ts, in_ptr, in_ts, gap=VELOCITY_GAP_SECONDS):
+    """
+    Velocity burst mask for every node in one pass over both CSR views.
+    """
+    n = out_ptr.size - 1
+    burst = np.zeros(n, dtype=np.bool_)
+    for u in prange(n):
+        burst[u] = has_velocity_burst(out_ptr, out_ts, in_ptr, in_ts, u, gap)
+    return burst
+
+
+@njit(cache=True)
+def scatter_edges(src, dst, ts, n):
+    """
+    Build out-edge and in-edge CSR arrays in a single pass over the edge list,
+    pushing every edge to both endpoints (stable counting sort by sender and
+    receiver, so rows keep the input edge order). Returns (out_ptr, out_col, out_ts, in_ptr, in_col, in_ts).
+    """
+    m = src.size
+    out_ptr = np.zeros(n + 1, dtype=np.int64)
+    in_ptr = np.zeros(n + 1, dtype=np.int64)
+    for e in range(m):
+        out_ptr[src[e] + 1] += 1
+        in_ptr[dst[e] + 1] += 1
+    for u in range(n):
+        out_ptr[u + 1] += out_ptr[u]
+        in_ptr[u + 1] += in_ptr[u]
+
+    out_col = np.empty(m, dtype=src.dtype)
+    out_ts = np.empty(m, dtype=ts.dtype)
+    in_col = np.empty(m, dtype=src.dtype)
+    in_ts = np.empty(m, dtype=ts.dtype)
+    out_pos = out_ptr[:-1].copy()
+    in_pos = in_ptr[:-1].copy()
+    for e in range(m):
+        s = src[e]
+        d = dst[e]
+        k = out_pos[s]
+        out_col[k] = d
+        out_ts[k] = ts[e]
+        out_pos[s] = k + 1
+        k = in_pos[d]
+        in_col[k] = s
+        in_ts[k] = ts[e]
+        in_pos[d] = k + 1
+    return out_ptr, out_col, out_ts, in_ptr, in_col, in_ts
@@ -0,0 +1,49 @@
+import random
+
+import networkx as nx
+import pandas as pd
+
+from graph_engine import GraphEngine, _find_short_cycles
+
+
+def _frame(edges):
+    return pd.DataFrame(
+        [(f"T{i}", s, r, 100.0, f"2024-01-{i % 28 + 1:02d} 00:00:00") for i, (s, r) in enumerate(edges)],
+        columns=["transaction_id", "sender_id", "receiver_id", "amount", "timestamp"],
+    )
+
+
+def test_fast_cycles_finds_short_ring_sharing_edge_with_long_ring():
+    # 8-account ring plus a 3-account ring that reuses one of its edges (a0 -> a1)
+    long_ring = [(f"a{i}", f"a{(i + 1) % 8}") for i in range(8)]
+    short_ring = [("a1", "b0"), ("b0", "a0")]
+    rng = random.Random(0)
+    for _ in range(200):
+        edges = long_ring + short_ring
+        rng.shuffle(edges)
+        sub = nx.DiGraph(edges)
+        cycles = _find_short_cycles(sub, 1)
+        assert len(cycles) == 1
+        assert sorted(cycles[0]) == ["a0", "a1", "b0"]
+        assert sub.number_of_edges() == len(edges)
+
+
+def test_fast_cycles_skips_two_cycles():
+    edges = [("a", "b"), ("b", "a"), ("a", "c"), ("c", "d"), ("d", "a")]
+    result = GraphEngine(_frame(edges)).run_analysis(fast_cycles=True)
+    assert [sorted(r["member_accounts"]) for r in result["fraud_rings"]] == [["a", "c", "d"]]
+
+
+def test_missing_account_id_is_kept_as_a_node():
+    df = _frame([("a", "b"), ("b", "c"), ("c", "a")])
+    df.loc[0, "sender_id"] = None
+    result = GraphEngine(df).run_analysis()
+    assert result["summary"]["total_accounts_analyzed"] == 4
+
+
+def test_unparseable_and_mixed_offset_timestamps_do_not_raise():
+    df = _frame([("a", "b"), ("b", "c"), ("c", "a")])
+    df["timestamp"] = ["notadate", "2024-01-01T10:00:00+05:30", "2024-01-01 10:00:00Z"]
+    engine = GraphEngine(df)
+    assert engine.out_ts.size == 2
+    engine.run_analysis()